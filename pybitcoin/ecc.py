@@ -1,7 +1,16 @@
+from __future__ import annotations
+
 from collections import namedtuple
-from copy import copy
 from enum import Enum
+from functools import lru_cache
 from math import log, floor
+from typing import List, Tuple
+
+try:
+    # GMP-backed integers make the modular arithmetic in scalar multiplication noticeably faster
+    from gmpy2 import mpz
+except ImportError:
+    mpz = int
 
 
 class Parity(Enum):
@@ -35,17 +44,22 @@ secp256k1 = Curve(
     h=1,
 )
 
+# Inverse of 2 modulo the curve prime, used to halve the slope when doubling a point
+_INV2 = pow(2, -1, secp256k1.p)
+
 
 class Point:
     __slots__ = ('x', 'y')
     curve = secp256k1
+    _G = None
 
     def __init__(self, x: int, y: int):
+        p = self.curve.p
         if x < 0 or y < 0:
             raise ValueError('Both coordinates have to be >= 0')
-        if x >= self.curve.p or y >= self.curve.p:
-            raise ValueError(f'Both coordinates have to < {self.curve.p}')
-        if x and y and (pow(y, 2, self.curve.p) - pow(x, 3, self.curve.p) - 7) % self.curve.p != 0:
+        if x >= p or y >= p:
+            raise ValueError(f'Both coordinates have to < {p}')
+        if x and y and (pow(y, 2, p) - pow(x, 3, p) - 7) % p != 0:
             raise ValueError('Point not on curve!')
 
         self.x = x
@@ -53,17 +67,43 @@ class Point:
 
     @classmethod
     def from_x(cls, x: int, parity: Parity):
-        y1, y2 = tonelli_shanks(pow(x, 3, cls.curve.p) + 7, cls.curve.p)
+        p = cls.curve.p
+        # y is a square root of x^3 + 7, so only x has to be validated before skipping the checks in the constructor
+        if not 0 <= x < p:
+            raise ValueError(f'x coordinate has to be >= 0 and < {p}')
+        y_squared = (pow(x, 3, p) + 7) % p
+
+        if p & 3 == 3:
+            # For p = 3 (mod 4) the square root has a closed form, no need for Tonelli-Shanks
+            y1 = pow(y_squared, (p + 1) >> 2, p)
+            if y1 * y1 % p != y_squared:
+                raise ValueError(f'No point on curve with x={x}')
+            y2 = p - y1
+        else:
+            y1, y2 = tonelli_shanks(y_squared, p)
         if parity == Parity.ODD:
             y = y1 if y1 & 1 else y2
         else:
             y = y2 if y1 & 1 else y1
 
-        return cls(x, y)
+        return cls._unchecked(x, y)
+
+    @classmethod
+    def _unchecked(cls, x: int, y: int):
+        '''Construct a point without validating its coordinates.
+
+        Only for points which are on the curve by construction, e.g. results of arithmetic on valid points. Anything
+        coming from outside the library has to go through the validating constructor.
+        '''
+        point = cls.__new__(cls)
+        point.x = x
+        point.y = y
+
+        return point
 
     @classmethod
     def inf(cls):
-        return Point(0, 0)
+        return cls._unchecked(0, 0)
 
     @classmethod
     def gen(cls):
@@ -73,8 +113,11 @@ class Point:
         r is order of the subgroup, i.e. the total number of points on the curve.
         For bitcoin curve -- secp256k1 -- cofactor is 1, meaning it has only 1 subgroup, which contains all the curve's
         points.
+        The same instance is returned on every call, so it must not be modified.
         """
-        return Point(cls.curve.g_x, cls.curve.g_y)
+        if cls._G is None:
+            cls._G = cls._unchecked(cls.curve.g_x, cls.curve.g_y)
+        return cls._G
 
     def __str__(self):
         return f'({self.x}, {self.y})'
@@ -91,21 +134,47 @@ class Point:
         if other.x == 0 and other.y == 0:
             return self
 
-        if self.x == other.x and self.y + other.y == self.curve.p:
-            return Point(0, 0)
+        p = self.curve.p
+        x1, y1, x2, y2 = self.x, self.y, other.x, other.y
+
+        if x1 == x2 and y1 + y2 == p:
+            return Point._unchecked(0, 0)
 
-        if self == other:
-            s = 3 * pow(self.x, 2, self.curve.p) * pow(2 * self.y, -1, self.curve.p)
+        if x1 == x2 and y1 == y2:
+            s = 3 * (x1 * x1 % p) * pow(y1, -1, p) % p * _INV2
         else:
-            s = (self.y - other.y) * pow(self.x - other.x, -1, self.curve.p)
+            s = (y1 - y2) * pow(x1 - x2, -1, p)
 
-        new_x = (pow(s, 2, self.curve.p) - self.x - other.x) % self.curve.p
-        new_y = (s * (self.x - new_x) - self.y) % self.curve.p
+        new_x = (s * s - x1 - x2) % p
+        new_y = (s * (x1 - new_x) - y1) % p
 
-        return Point(new_x, new_y)
+        return Point._unchecked(new_x, new_y)
+
+    def add_many(self, others: List[Point]) -> List[Point]:
+        '''Return [self + other for other in others], sharing a single modular inverse between all the additions.'''
+        p = self.curve.p
+        if self.x == 0 and self.y == 0:
+            return list(others)
+
+        # Slope denominators; pairs that need doubling or hit infinity fall back to __add__ and get a dummy 1
+        dxs = [(other.x - self.x) % p or 1 for other in others]
+        inverses = batch_inverse(dxs, p)
+
+        result = []
+        for other, inverse in zip(others, inverses):
+            if other.x == self.x or (other.x == 0 and other.y == 0):
+                result.append(self + other)
+                continue
+
+            s = (other.y - self.y) * inverse % p
+            new_x = (s * s - self.x - other.x) % p
+            new_y = (s * (self.x - new_x) - self.y) % p
+            result.append(Point._unchecked(new_x, new_y))
+
+        return result
 
     def __neg__(self):
-        return Point(self.x, -self.y % self.curve.p)
+        return Point._unchecked(self.x, -self.y % self.curve.p)
 
     def __rmul__(self, other: int):
         return self * other
@@ -118,17 +187,272 @@ class Point:
             return self
         if other < 0:
             return -(self * -other)
+        if other == 0 or (self.x == 0 and self.y == 0):
+            return Point.inf()
+
+        curve = self.curve
+        p = mpz(curve.p)
+
+        if self.x == curve.g_x and self.y == curve.g_y:
+            return Point._unchecked(*_jac_to_affine(_mul_by_g(other, curve), p))
+
+        # GLV decomposition: other * P == k1 * P + k2 * phi(P), where phi(x, y) = (beta * x, y) == lambda * P. Both
+        # halves are ~128 bits long, so a joint double-and-add over them needs half the doublings.
+        k1, k2 = _glv_decompose(other % curve.n, curve.n)
+
+        # Odd multiples P, 3P, 5P, ... of self, indexed by |digit| // 2
+        base = (self.x, self.y, 1)
+        double_base = _jac_double(base, p)
+        table = [base]
+        for _ in range((1 << (WNAF_WIDTH - 2)) - 1):
+            table.append(_jac_add(table[-1], double_base, p))
+        phi_table = [(GLV_BETA * x % p, y, z) for x, y, z in table]
+
+        terms = []
+        for k, t in ((k1, table), (k2, phi_table)):
+            if k < 0:
+                k, t = -k, [(x, p - y, z) for x, y, z in t]
+            terms.append((_wnaf(k), t))
+
+        return Point._unchecked(*_jac_to_affine(_jac_multi_mul(terms, p), p))
+
+
+# secp256k1 endomorphism constants: beta is a cube root of unity mod p, lambda a cube root of unity mod n, and
+# lambda * (x, y) == (beta * x, y) for every point on the curve
+GLV_BETA = 0x7AE96A2B657C07106E64479EAC3434E99CF0497512F58995C1396C28719501EE
+GLV_LAMBDA = 0x5363AD4CC05C30E0A5261C028812645A122E22EA20816678DF02967C1B23BD72
+
+# Short basis (a1, b1), (a2, b2) of the lattice {(x, y): x + y * lambda = 0 (mod n)}
+GLV_A1 = 0x3086D221A7D46BCDE86C90E49284EB15
+GLV_B1 = -0xE4437ED6010E88286F547FA90ABFE4C3
+GLV_A2 = 0x114CA50F7A8E2F3F657C1108D9D44CFD8
+GLV_B2 = 0x3086D221A7D46BCDE86C90E49284EB15
+
+
+def _glv_decompose(k: int, n: int) -> Tuple[int, int]:
+    '''Split 0 <= k < n into k1 and k2 of roughly 128 bits each, such that k == k1 + k2 * lambda (mod n).'''
+    c1 = (GLV_B2 * k + (n >> 1)) // n
+    c2 = (-GLV_B1 * k + (n >> 1)) // n
+
+    k1 = k - c1 * GLV_A1 - c2 * GLV_A2
+    k2 = -c1 * GLV_B1 - c2 * GLV_B2
+
+    return k1, k2
+
+
+WNAF_WIDTH = 5
+
+# The fixed-base generator table splits 256-bit scalars into byte-sized windows
+G_TABLE_WINDOWS = 32
+
+
+def _wnaf(k: int, w: int = WNAF_WIDTH) -> List[int]:
+    '''Width-w non-adjacent form of k, least significant digit first.
+
+    Every non-zero digit is odd and lies in [-(2^(w-1) - 1), 2^(w-1) - 1], and any w consecutive digits contain at most
+    one non-zero digit, so a 256-bit scalar needs roughly 256 / (w + 1) point additions.
+    '''
+    digits = []
+    window = 1 << w
+    half = window >> 1
+
+    while k:
+        if k & 1:
+            digit = k & (window - 1)
+            if digit >= half:
+                digit -= window
+            k -= digit
+        else:
+            digit = 0
+        digits.append(digit)
+        k >>= 1
+
+    return digits
+
+
+# Jacobian coordinates (X, Y, Z) represent the affine point (X / Z^2, Y / Z^3). They let us chain additions and
+# doublings without a modular inverse per step -- only a single inverse is needed when converting back to affine.
+_JacPoint = Tuple[int, int, int]
+
+_JAC_INF = (1, 1, 0)
+
+
+def _jac_multi_mul(terms: List[Tuple[List[int], List[_JacPoint]]], p: int) -> _JacPoint:
+    '''Compute the sum of k_i * P_i with a single shared chain of doublings.
+
+    Each term is the wNAF of k_i and the table of odd multiples P_i, 3P_i, 5P_i, ... in Jacobian coordinates.
+    '''
+    q = _JAC_INF
+
+    for i in reversed(range(max(len(digits) for digits, _ in terms))):
+        q = _jac_double(q, p)
+        for digits, table in terms:
+            digit = digits[i] if i < len(digits) else 0
+            if digit > 0:
+                q = _jac_add(q, table[digit >> 1], p)
+            elif digit < 0:
+                x, y, z = table[-digit >> 1]
+                q = _jac_add(q, (x, p - y, z), p)
+
+    return q
+
+
+def _jac_double(q: _JacPoint, p: int) -> _JacPoint:
+    x, y, z = q
+    if not z or not y:
+        return _JAC_INF
+
+    y2 = y * y % p
+    s = 4 * x * y2 % p
+    m = 3 * x * x % p  # a = 0 for secp256k1
+    new_x = (m * m - 2 * s) % p
+    new_y = (m * (s - new_x) - 8 * y2 * y2) % p
+    new_z = 2 * y * z % p
+
+    return new_x, new_y, new_z
+
+
+def _jac_add_mixed(q: _JacPoint, x2: int, y2: int, p: int) -> _JacPoint:
+    '''Add affine point (x2, y2) to Jacobian point q.'''
+    x1, y1, z1 = q
+    if not z1:
+        return x2, y2, 1
+
+    z1z1 = z1 * z1 % p
+    u2 = x2 * z1z1 % p
+    s2 = y2 * z1 * z1z1 % p
+    h = (u2 - x1) % p
+    r = (s2 - y1) % p
+
+    if not h:
+        return _jac_double(q, p) if not r else _JAC_INF
+
+    hh = h * h % p
+    hhh = h * hh % p
+    v = x1 * hh % p
+    new_x = (r * r - hhh - 2 * v) % p
+    new_y = (r * (v - new_x) - y1 * hhh) % p
+    new_z = z1 * h % p
+
+    return new_x, new_y, new_z
+
+
+def _jac_add(q1: _JacPoint, q2: _JacPoint, p: int) -> _JacPoint:
+    x1, y1, z1 = q1
+    x2, y2, z2 = q2
+    if not z1:
+        return q2
+    if not z2:
+        return q1
+
+    z1z1 = z1 * z1 % p
+    z2z2 = z2 * z2 % p
+    u1 = x1 * z2z2 % p
+    u2 = x2 * z1z1 % p
+    s1 = y1 * z2 * z2z2 % p
+    s2 = y2 * z1 * z1z1 % p
+    h = (u2 - u1) % p
+    r = (s2 - s1) % p
+
+    if not h:
+        return _jac_double(q1, p) if not r else _JAC_INF
+
+    hh = h * h % p
+    hhh = h * hh % p
+    v = u1 * hh % p
+    new_x = (r * r - hhh - 2 * v) % p
+    new_y = (r * (v - new_x) - s1 * hhh) % p
+    new_z = z1 * z2 * h % p
+
+    return new_x, new_y, new_z
+
+
+@lru_cache(maxsize=None)
+def _g_table(curve: Curve) -> Tuple[List[int], List[int]]:
+    '''Precomputed affine multiples of the generator, b * 2^(8 * i) * G for b in [0, 256) and i in [0, 32).
+
+    The coordinates are stored as two flat parallel lists, xs and ys, indexed by 256 * i + b, rather than as a list of
+    points or coordinate pairs. Built once per process on first use; entries with b == 0 are never read.
+    '''
+    p = mpz(curve.p)
+    xs, ys = [], []
+    base = (curve.g_x, curve.g_y, 1)
+
+    for _ in range(G_TABLE_WINDOWS):
+        row = [base]
+        for _ in range(254):
+            row.append(_jac_add(row[-1], base, p))
+
+        xs.append(0)
+        ys.append(0)
+        for x, y in _jac_to_affine_many(row, p):
+            xs.append(x)
+            ys.append(y)
+
+        for _ in range(8):
+            base = _jac_double(base, p)
+
+    return xs, ys
+
+
+def _mul_by_g(k: int, curve: Curve) -> _JacPoint:
+    '''Multiply the generator by k using only table lookups and mixed additions -- no doublings.'''
+    p = mpz(curve.p)
+    xs, ys = _g_table(curve)
+    q = _JAC_INF
+
+    for i, byte in enumerate((k % curve.n).to_bytes(G_TABLE_WINDOWS, byteorder='little')):
+        if byte:
+            index = i << 8 | byte
+            q = _jac_add_mixed(q, xs[index], ys[index], p)
+
+    return q
+
+
+def _jac_to_affine(q: _JacPoint, p: int) -> Tuple[int, int]:
+    '''Convert a Jacobian point to affine coordinates, always returned as Python ints.'''
+    x, y, z = q
+    if not z:
+        return 0, 0
+
+    z_inv = pow(z, -1, p)
+    z_inv2 = z_inv * z_inv % p
+
+    return int(x * z_inv2 % p), int(y * z_inv2 * z_inv % p)
+
+
+def _jac_to_affine_many(qs: List[_JacPoint], p: int) -> List[Tuple[int, int]]:
+    '''Convert finite Jacobian points to affine coordinates with a single modular inverse.'''
+    result = []
+    for (x, y, _), z_inv in zip(qs, batch_inverse([z for _, _, z in qs], p)):
+        z_inv2 = z_inv * z_inv % p
+        result.append((x * z_inv2 % p, y * z_inv2 * z_inv % p))
+
+    return result
+
+
+def batch_inverse(xs: List[int], p: int) -> List[int]:
+    '''Invert every element of xs modulo p using Montgomery's trick: one modular inverse and 3(n - 1) multiplications.
+
+    All elements have to be invertible, i.e. non-zero modulo p.
+    '''
+    if not xs:
+        return []
 
-        n = copy(self)
-        q = Point.inf()
+    prefix_products = []
+    acc = 1
+    for x in xs:
+        acc = acc * x % p
+        prefix_products.append(acc)
 
-        while other:
-            if other % 2:
-                q += n
-            n += n
-            other //= 2
+    inverses = [0] * len(xs)
+    inv = pow(acc, -1, p)
+    for i in range(len(xs) - 1, 0, -1):
+        inverses[i] = inv * prefix_products[i - 1] % p
+        inv = inv * xs[i] % p
+    inverses[0] = inv
 
-        return q
+    return inverses
 
 
 def legendre(x, p):
@@ -2,80 +2,135 @@ from __future__ import annotations
 
 import hashlib
 import hmac
-from itertools import takewhile
+import multiprocessing
+import os
+import queue
 from math import ceil
 from secrets import randbelow
+from typing import List, Tuple
 
 from tqdm import tqdm
 
-from pybitcoin.ecc import Point, secp256k1
+try:
+    # libsecp256k1 bindings, used for public key generation and derivation when installed
+    import coincurve
+except ImportError:
+    coincurve = None
+
+from pybitcoin.ecc import GLV_BETA, GLV_LAMBDA, Point, secp256k1
+from pybitcoin.ripemd160 import ripemd160 as _ripemd160
 
 HARDENED_CHILD_INDEX = 2 ** 31
 
+try:
+    RIPEMD160_TEMPLATE = hashlib.new('ripemd160')
+except ValueError:  # pragma: no cover
+    # Not provided by OpenSSL 3 builds without the legacy provider, the pure Python implementation is used instead
+    RIPEMD160_TEMPLATE = None
 
-def hmac_sha512(key, msg):
+# Number of consecutive candidate keys whose point additions share one modular inverse in vanity_address
+VANITY_BATCH_SIZE = 256
+
+
+def _check_sha512():
     if 'sha512' not in hashlib.algorithms_available:
         raise Exception('Make sure your OpenSSL version provides SHA-512 algorithm!')
+
+
+def hmac_sha512(key, msg):
+    _check_sha512()
     return hmac.digest(key=key, msg=msg, digest='sha512')
 
 
+def hmac_sha512_keyed(key):
+    '''HMAC-SHA512 state keyed with key; a copy updated with msg gives the same digest as hmac_sha512(key, msg).'''
+    _check_sha512()
+    return hmac.new(key, digestmod='sha512')
+
+
 def sha256(data: bytes) -> bytes:
     return hashlib.sha256(data).digest()
 
 
 def ripemd160(data: bytes) -> bytes:
-    if 'ripemd160' not in hashlib.algorithms_available:
-        raise Exception('Make sure your OpenSSL version provides ripemd160 algorithm!')
-    return hashlib.new('ripemd160', data).digest()
+    if RIPEMD160_TEMPLATE is None:  # pragma: no cover
+        return _ripemd160(data)
+    # Copying an initialized context skips OpenSSL's algorithm lookup by name that hashlib.new does on every call
+    ripemd = RIPEMD160_TEMPLATE.copy()
+    ripemd.update(data)
+    return ripemd.digest()
+
+
+def hash160(data: bytes) -> bytes:
+    '''RIPEMD-160 of SHA-256, as used for public key identifiers.'''
+    return ripemd160(sha256(data))
 
 
+# Version and flag bytes, indexed by the testnet/compressed flag or by the parity of y
+WIF_PREFIXES = (b'\x80', b'\xef')
+WIF_COMPRESSED_SUFFIXES = (b'', b'\x01')
+ADDRESS_PREFIXES = (b'\x00', b'\x6f')
+COMPRESSED_PUBLIC_KEY_PREFIXES = (b'\x02', b'\x03')
+
+# SHA-256 states which have already absorbed the prefix byte of an even (0x02) and odd (0x03) compressed public key
+SHA256_COMPRESSED_PREFIXES = tuple(hashlib.sha256(prefix) for prefix in COMPRESSED_PUBLIC_KEY_PREFIXES)
+
 # Byte order bit endian
 BIG = 'big'
 
 BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
 BASE58_ALPHABET_REVERSE = {c: i for i, c in enumerate(BASE58_ALPHABET)}
+# Maps digit values 0..57 to their Base58 characters, for use with bytes.translate
+BASE58_ENCODE_TABLE = bytes.maketrans(bytes(range(58)), BASE58_ALPHABET.encode('ascii'))
+# Maps ASCII Base58 characters to their digit values and every other byte to 0xFF, for use with bytes.translate
+BASE58_DECODE_TABLE = bytes(BASE58_ALPHABET_REVERSE.get(chr(i), 0xFF) for i in range(256))
 
 
 class Base58DecodeError(ValueError):
     pass
 
 
+def _sha256d_checksum(payload: bytes) -> bytes:
+    sha = hashlib.sha256
+    return sha(sha(payload).digest()).digest()[:4]
+
+
 def base58check_encode(payload: bytes) -> str:
-    result = []
-    check = sha256(sha256(payload))[:4]
-    data = payload + check
-    leading_zeros = sum(1 for _ in takewhile((0).__eq__, data))
+    data = payload + _sha256d_checksum(payload)
+    leading_zeros = len(data) - len(data.lstrip(b'\x00'))
 
     number = int.from_bytes(data, byteorder=BIG)
 
+    # Every byte needs at most log(256) / log(58) < 1.38 digits; the buffer is filled with digit values from the back,
+    # and its zero-initialized head doubles as the '1' digits for leading zero bytes.
+    digits = bytearray(len(data) * 138 // 100 + 1)
+    i = len(digits)
     while number:
-        result.append(BASE58_ALPHABET[number % 58])
-        number //= 58
-
-    result += ['1'] * leading_zeros
+        number, digit = divmod(number, 58)
+        i -= 1
+        digits[i] = digit
 
-    return ''.join(reversed(result))
+    return digits[i - leading_zeros :].translate(BASE58_ENCODE_TABLE).decode('ascii')
 
 
 def base58check_decode(data: str) -> bytes:
-    if any(c not in BASE58_ALPHABET_REVERSE for c in data):
+    # Non-ASCII characters become '?', which like every other character outside the alphabet translates to 0xFF
+    digits = data.encode('ascii', 'replace').translate(BASE58_DECODE_TABLE)
+    if 0xFF in digits:
         raise Base58DecodeError('Given string is not Base58Check encoded!')
 
-    leading_zeros = sum(1 for _ in takewhile('1'.__eq__, data))
+    leading_zeros = len(data) - len(data.lstrip('1'))
 
     number = 0
-    p = 1
-    for i, c in enumerate(data[::-1]):
-        if c != '1':
-            number += BASE58_ALPHABET_REVERSE[c] * p
-        p *= 58
+    for digit in digits:
+        number = number * 58 + digit
 
     num_bytes = ceil(number.bit_length() / 8)
     bytes_data = number.to_bytes(num_bytes, byteorder=BIG)
     payload = b'\x00' * leading_zeros + bytes_data[:-4]
     check = bytes_data[-4:]
 
-    if sha256(sha256(payload))[:4] != check:
+    if _sha256d_checksum(payload) != check:
         raise Base58DecodeError('Check does not match')
 
     return payload
@@ -86,6 +141,8 @@ class InvalidKeyError(ValueError):
 
 
 class PrivateKey:
+    __slots__ = ('k', 'testnet', 'compressed')
+
     def __init__(self, k: int = None, testnet=False, compressed=False):
         if k is not None and not (0 < k < secp256k1.n):
             raise InvalidKeyError(f'k={k} must be >0 and <{secp256k1.n}')
@@ -100,7 +157,12 @@ class PrivateKey:
         return self.k == other.k and self.compressed == other.compressed and self.testnet == other.testnet
 
     def generate_public_key(self):
-        return PublicKey(point=self.k * Point.gen(), testnet=self.testnet)
+        if coincurve is not None:
+            point = Point(*coincurve.PrivateKey(self.k.to_bytes(32, byteorder=BIG)).public_key.point())
+        else:
+            point = self.k * Point.gen()
+
+        return PublicKey(point=point, testnet=self.testnet)
 
     def encode(self, prefix=b'', suffix=b''):
         return prefix + self.k.to_bytes(32, byteorder=BIG) + suffix
@@ -108,8 +170,8 @@ class PrivateKey:
     def to_wif(self) -> str:
         return base58check_encode(
             self.encode(
-                prefix=b'\xef' if self.testnet else b'\x80',
-                suffix=b'\x01' if self.compressed else b'',
+                prefix=WIF_PREFIXES[bool(self.testnet)],
+                suffix=WIF_COMPRESSED_SUFFIXES[bool(self.compressed)],
             )
         )
 
@@ -123,39 +185,183 @@ class PrivateKey:
 
         return PrivateKey(
             k=int.from_bytes(key, byteorder=BIG),
-            testnet=prefix == b'\xef',
-            compressed=suffix == b'\x01',
+            testnet=prefix == WIF_PREFIXES[True],
+            compressed=suffix == WIF_COMPRESSED_SUFFIXES[True],
         )
 
     @classmethod
-    def vanity_address(cls, prefix: str, verbose=False):
+    def vanity_address(cls, prefix: str, verbose=False, workers=None):
+        '''Search for a mainnet private key whose address starts with prefix.
+
+        The search is spread over workers processes, one per CPU by default. With workers=1 it runs in the calling
+        process.
+        '''
         if prefix[0] != '1':
             raise ValueError('Prefix has to start with 1!')
+        if any(c not in BASE58_ALPHABET_REVERSE for c in prefix):
+            raise ValueError(f'Prefix {prefix} contains characters outside of the Base58 alphabet!')
 
-        address = ''
-        t = tqdm(disable=not verbose)
-        i = 0
-        while True:
-            for compressed in (True, False):
-                prv = PrivateKey(compressed=compressed)
-                pub = prv.generate_public_key()
-                address = pub.to_address()
+        identifier_ranges = _address_prefix_ranges(prefix)
+        if not identifier_ranges:
+            raise ValueError(f'No address can start with {prefix}!')
 
-                if address.startswith(prefix):
-                    return prv
+        if workers is None:
+            workers = os.cpu_count() or 1
 
-                t.update(i)
-                i += 1
+        t = tqdm(disable=not verbose)
+        if workers == 1:
+            k, compressed = _vanity_search(prefix, identifier_ranges, progress=t.update)
+            return PrivateKey(k=k, compressed=compressed)
+
+        # Every worker walks from its own random starting key, the first one to find a match wins
+        results = multiprocessing.Queue()
+        stop = multiprocessing.Event()
+        counter = multiprocessing.Value('Q', 0)
+        processes = [
+            multiprocessing.Process(
+                target=_vanity_worker, args=(prefix, identifier_ranges, results, stop, counter), daemon=True
+            )
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+
+        try:
+            while True:
+                try:
+                    k, compressed = results.get(timeout=0.1)
+                    break
+                except queue.Empty:
+                    if not any(process.is_alive() for process in processes) and results.empty():
+                        raise RuntimeError('All vanity address workers exited without finding a match!')
+                    t.update(counter.value - t.n)
+        finally:
+            stop.set()
+            for process in processes:
+                process.join()
+
+        return PrivateKey(k=k, compressed=compressed)
+
+
+def _vanity_search(prefix: str, identifier_ranges, stop=None, progress=None):
+    '''Walk private keys from a random start until one has an address starting with prefix.
+
+    Returns (k, compressed) for the match, or None if stop was set before one was found.
+    '''
+    # Walk k, k + 1, k + 2, ... so each candidate costs one point addition instead of a full scalar multiplication.
+    # Additions are done in batches that share a single modular inverse.
+    gen = Point.gen()
+    multiples = [gen]
+    for _ in range(VANITY_BATCH_SIZE - 1):
+        multiples.append(multiples[-1] + gen)
+
+    p, n = secp256k1.p, secp256k1.n
+    k = PrivateKey().k
+    point = k * gen
+
+    while stop is None or not stop.is_set():
+        if k + VANITY_BATCH_SIZE >= n:
+            k, point = 1, gen
+
+        candidates = point.add_many(multiples)
+        for offset, candidate in enumerate(candidates, start=1):
+            x, y = candidate.x, candidate.y
+            beta_x = GLV_BETA * x % p
+            neg_y = p - y
+
+            # Besides P = kG, the endomorphism and negation give phi(P) = (lambda * k)G, -P = (-k)G and
+            # -phi(P) = (-lambda * k)G with just a multiplication and a subtraction
+            for x, y, factor in ((x, y, 1), (beta_x, y, GLV_LAMBDA), (x, neg_y, -1), (beta_x, neg_y, -GLV_LAMBDA)):
+                pub = PublicKey(point=Point._unchecked(x, y))
+
+                # Only the x coordinate is left to hash for the compressed encoding
+                compressed_sha = SHA256_COMPRESSED_PREFIXES[y & 1].copy()
+                compressed_sha.update(x.to_bytes(32, byteorder=BIG))
+                identifiers = (
+                    (True, ripemd160(compressed_sha.digest())),
+                    (False, pub.get_identifier(compressed=False)),
+                )
+
+                for compressed, identifier in identifiers:
+                    # Cheap check on the raw identifier first, full Base58Check encoding only for likely matches
+                    identifier = int.from_bytes(identifier, byteorder=BIG)
+                    if any(lo <= identifier <= hi for lo, hi in identifier_ranges):
+                        if pub.to_address(compressed=compressed).startswith(prefix):
+                            return factor * (k + offset) % n, compressed
+
+        if progress is not None:
+            progress(8 * VANITY_BATCH_SIZE)
+
+        k += VANITY_BATCH_SIZE
+        point = candidates[-1]
+
+    return None
+
+
+def _vanity_worker(prefix: str, identifier_ranges, results, stop, counter):
+    def progress(n):
+        with counter.get_lock():
+            counter.value += n
+
+    match = _vanity_search(prefix, identifier_ranges, stop=stop, progress=progress)
+    if match is not None:
+        results.put(match)
+
+
+def _address_prefix_ranges(prefix: str) -> List[Tuple[int, int]]:
+    '''Inclusive ranges of 20-byte identifiers (as big endian integers) whose mainnet addresses may start with prefix.
+
+    Base58 digits of the address depend on the 4 checksum bytes as well, so an identifier inside a range is only a
+    candidate -- the full address still has to be checked -- but identifiers outside all ranges can never match.
+    '''
+    rest = prefix.lstrip('1')
+    # One leading '1' comes from the version byte, every other one from a leading zero byte of the identifier
+    zero_bytes = len(prefix) - len(rest) - 1
+    if zero_bytes > 20:
+        return []
+
+    if not rest:
+        return [(0, (1 << 8 * (20 - zero_bytes)) - 1)]
+
+    # Value of identifier + checksum, with exactly zero_bytes leading zero bytes
+    lower = 1 << 8 * (23 - zero_bytes)
+    upper = 1 << 8 * (24 - zero_bytes)
+
+    value = 0
+    for c in rest:
+        value = value * 58 + BASE58_ALPHABET_REVERSE[c]
+
+    ranges = []
+    scale = 1
+    while value * scale < upper:
+        lo = max(value * scale, lower)
+        hi = min((value + 1) * scale, upper)
+        if lo < hi:
+            ranges.append((lo >> 32, (hi - 1) >> 32))
+        scale *= 58
+
+    return ranges
 
 
 class PublicKey:
+    __slots__ = ('_point', 'testnet', '_encoded', '_identifiers', '_addresses')
+
     def __init__(self, point: Point, testnet=False):
-        self.point = point
+        self._point = point
         self.testnet = testnet
 
+        # Serializations are cached per compression flag (and per network for addresses)
+        self._encoded = {}
+        self._identifiers = {}
+        self._addresses = {}
+
     def __repr__(self):
         return f'PublicKey(x={hex(self.x)}, y={hex(self.y)})'
 
+    @property
+    def point(self):
+        return self._point
+
     @property
     def x(self):
         return self.point.x
@@ -165,39 +371,96 @@ class PublicKey:
         return self.point.y
 
     def encode(self, compressed=True):
-        if compressed:
-            prefix = b'\x02' if self.y % 2 == 0 else b'\x03'
-            return prefix + self.x.to_bytes(32, byteorder=BIG)
-        else:
-            prefix = b'\x04'
-            return prefix + self.x.to_bytes(32, byteorder=BIG) + self.y.to_bytes(32, byteorder=BIG)
+        data = self._encoded.get(compressed)
+        if data is None:
+            if compressed:
+                prefix = COMPRESSED_PUBLIC_KEY_PREFIXES[self.y & 1]
+                data = prefix + self.x.to_bytes(32, byteorder=BIG)
+            else:
+                # One 65 byte conversion instead of concatenating the prefix and two 32 byte conversions
+                data = (4 << 512 | self.x << 256 | self.y).to_bytes(65, byteorder=BIG)
+            self._encoded[compressed] = data
+
+        return data
 
     def get_identifier(self, compressed=True) -> bytes:
-        return ripemd160(sha256(self.encode(compressed=compressed)))
+        identifier = self._identifiers.get(compressed)
+        if identifier is None:
+            identifier = self._identifiers[compressed] = hash160(self.encode(compressed=compressed))
+
+        return identifier
 
     def to_address(self, compressed=True) -> str:
-        prefix = b'\x00' if not self.testnet else b'\x6f'
-        return base58check_encode(payload=prefix + self.get_identifier(compressed=compressed))
+        testnet = bool(self.testnet)
+        address = self._addresses.get((testnet, compressed))
+        if address is None:
+            payload = ADDRESS_PREFIXES[testnet] + self.get_identifier(compressed=compressed)
+            address = self._addresses[(testnet, compressed)] = base58check_encode(payload=payload)
+
+        return address
 
     def to_hex(self, compressed=True) -> str:
         return self.encode(compressed=compressed).hex()
 
 
 class ExtendedKey:
+    __slots__ = (
+        '_key',
+        '_chain_code',
+        '_chain_code_hmac',
+        'depth',
+        'parent_fingerprint',
+        'index',
+        '_wif',
+        '_wif_payload',
+    )
+
     VERSIONS = {
         'testnet': b'',
         'mainnet': b'',
     }
 
     def __init__(self, key, chain_code: bytes, depth=0, parent_fingerprint=b'\x00\x00\x00\x00', index=0):
-        self._validate_key(key)
-
         self.key = key
         self.chain_code = chain_code
         self.depth = depth
         self.parent_fingerprint = parent_fingerprint
         self.index = index
 
+        self._wif = None
+        self._wif_payload = None
+
+    @property
+    def key(self):
+        return self._key
+
+    @key.setter
+    def key(self, key):
+        self._validate_key(key)
+        self._key = key
+
+    @property
+    def chain_code(self) -> bytes:
+        return self._chain_code
+
+    @chain_code.setter
+    def chain_code(self, chain_code: bytes):
+        self._chain_code = chain_code
+        self._chain_code_hmac = None
+
+    def _hmac_sha512(self, msg: bytes) -> bytes:
+        '''HMAC-SHA512 keyed with the chain code.
+
+        The keyed inner and outer hash states are set up once per key and copied for every message, so deriving many
+        children of the same key skips the HMAC key schedule.
+        '''
+        if self._chain_code_hmac is None:
+            self._chain_code_hmac = hmac_sha512_keyed(self.chain_code)
+
+        h = self._chain_code_hmac.copy()
+        h.update(msg)
+        return h.digest()
+
     def _validate_key(self, key):
         raise NotImplementedError
 
@@ -214,13 +477,21 @@ class ExtendedKey:
         encoded_key = self._get_encoded_key()
 
         payload = version + depth + self.parent_fingerprint + child_number + self.chain_code + encoded_key
-        return base58check_encode(payload)
+        # Building the payload is cheap, Base58Check encoding it is not; reuse the last result while the payload is
+        # unchanged
+        if payload != self._wif_payload:
+            self._wif = base58check_encode(payload)
+            self._wif_payload = payload
+
+        return self._wif
 
     def from_wif(self, data: str):
         pass
 
 
 class ExtendedPrivateKey(ExtendedKey):
+    __slots__ = ('_public_key',)
+
     VERSIONS = {
         'testnet': b'\x04\x35\x83\x94',
         'mainnet': b'\x04\x88\xAD\xE4',
@@ -229,6 +500,19 @@ class ExtendedPrivateKey(ExtendedKey):
     def __repr__(self):
         return f'ExtendedPrivateKey(key={self.key}, index={self.index}'
 
+    @ExtendedKey.key.setter
+    def key(self, key):
+        ExtendedKey.key.fset(self, key)
+        self._public_key = None
+
+    @property
+    def public_key(self) -> PublicKey:
+        '''Public key of self.key, generated on first use since every child derivation needs it.'''
+        if self._public_key is None:
+            self._public_key = self.key.generate_public_key()
+
+        return self._public_key
+
     def _validate_key(self, key):
         if not isinstance(key, PrivateKey):
             raise ValueError('Private key must be supplied!')
@@ -237,17 +521,19 @@ class ExtendedPrivateKey(ExtendedKey):
         return self.key.encode(prefix=b'\x00')
 
     def derive_private_child(self, index: int) -> ExtendedPrivateKey:
-        public_key = self.key.generate_public_key()
+        public_key = self.public_key
 
         if index >= HARDENED_CHILD_INDEX:
-            data = self.key.encode(prefix=b'\x00')
+            # Packing below would silently OR the excess bits into k
+            if index >> 32:
+                raise OverflowError(f'Child index {index} does not fit in 4 bytes')
+            # 0x00 || ser256(k) || ser32(index), packed into one integer and converted once
+            data = (self.key.k << 32 | index).to_bytes(37, byteorder=BIG)
 
         else:
-            data = public_key.encode(compressed=True)
-
-        data += index.to_bytes(4, byteorder=BIG)
+            data = public_key.encode(compressed=True) + index.to_bytes(4, byteorder=BIG)
 
-        out = hmac_sha512(key=self.chain_code, msg=data)
+        out = self._hmac_sha512(data)
         out_l = int.from_bytes(out[:32], byteorder=BIG)
         out_r = out[32:]
 
@@ -269,7 +555,7 @@ class ExtendedPrivateKey(ExtendedKey):
 
     def generate_public_key(self):
         return ExtendedPublicKey(
-            key=self.key.generate_public_key(),
+            key=self.public_key,
             chain_code=self.chain_code,
             depth=self.depth,
             parent_fingerprint=self.parent_fingerprint,
@@ -278,6 +564,8 @@ class ExtendedPrivateKey(ExtendedKey):
 
 
 class ExtendedPublicKey(ExtendedKey):
+    __slots__ = ()
+
     VERSIONS = {
         'testnet': b'\x04\x35\x87\xCF',
         'mainnet': b'\x04\x88\xB2\x1E',
@@ -302,16 +590,23 @@ class ExtendedPublicKey(ExtendedKey):
 
         data = self.key.encode() + index.to_bytes(4, byteorder=BIG)
 
-        out = hmac_sha512(key=self.chain_code, msg=data)
+        out = self._hmac_sha512(data)
         out_l = int.from_bytes(out[:32], byteorder=BIG)
         out_r = out[32:]
 
         if out_l >= secp256k1.n:
             raise UseNextIndex
 
-        child_key_point = PrivateKey(k=out_l).generate_public_key().point + self.key.point
-        if child_key_point == Point.inf():
-            raise UseNextIndex
+        if coincurve is not None:
+            try:
+                child_key_point = Point(*coincurve.PublicKey(self.key.encode()).add(out[:32]).point())
+            except ValueError:
+                # Tweaking resulted in the point at infinity
+                raise UseNextIndex
+        else:
+            child_key_point = PrivateKey(k=out_l).generate_public_key().point + self.key.point
+            if child_key_point == Point.inf():
+                raise UseNextIndex
 
         child_key = PublicKey(point=child_key_point, testnet=self.key.testnet)
         return ExtendedPublicKey(
@@ -1,21 +1,30 @@
+from __future__ import annotations
+
 from enum import Enum
+from functools import lru_cache
+from typing import Callable
 
-from pybitcoin.keys import BIG
+# Pushes of up to 75 bytes are encoded as a single length byte followed by the data
+MAX_DIRECT_PUSH_SIZE = 75
+PUSH_LENGTH_PREFIXES = tuple(bytes((i,)) for i in range(MAX_DIRECT_PUSH_SIZE + 1))
 
 
+# Transactions tend to repeat the same few scripts (e.g. P2PKH to the same address), and encoding is pure
+@lru_cache(maxsize=1024)
 def script_encode(script: str) -> bytes:
-    data = []
+    data = bytearray()
 
     tokens = script.split()
     for token in tokens:
-        try:
-            encoded_data = OpCodes[token].value
-        except KeyError:
+        encoded_data = OPCODE_BYTES.get(token)
+        if encoded_data is None:
             encoded_data = bytes.fromhex(token)
-            encoded_data = len(encoded_data).to_bytes(1, byteorder=BIG) + encoded_data
-        data.append(encoded_data)
+            if len(encoded_data) > MAX_DIRECT_PUSH_SIZE:
+                raise ValueError(f'Cannot push {len(encoded_data)} bytes without OP_PUSHDATA1/2/4!')
+            data += PUSH_LENGTH_PREFIXES[len(encoded_data)]
+        data += encoded_data
 
-    return b''.join(data)
+    return bytes(data)
 
 
 def script_decode(data: bytes) -> str:
@@ -34,6 +43,88 @@ def script_decode(data: bytes) -> str:
     return ' '.join(tokens)
 
 
+def compile_script_template(template: str) -> Callable[..., bytes]:
+    '''Compile a script with {name} placeholders for push data into a function encoding it for given pushes.
+
+    Everything apart from the placeholders is encoded once, e.g. for P2PKH:
+
+        p2pkh = compile_script_template('OP_DUP OP_HASH160 {pkh} OP_EQUALVERIFY OP_CHECKSIG')
+        script_pub_key = p2pkh(pkh=identifier)
+    '''
+    # Alternating encoded constant parts and placeholder names, starting and ending with a constant part
+    parts = []
+    constant = bytearray()
+    for token in template.split():
+        if token[0] == '{' and token[-1] == '}':
+            parts.append(bytes(constant))
+            parts.append(token[1:-1])
+            constant.clear()
+        else:
+            constant += script_encode(token)
+    parts.append(bytes(constant))
+
+    head = parts[0]
+    tail = [(parts[i], parts[i + 1]) for i in range(1, len(parts), 2)]
+
+    def encode(**pushes: bytes) -> bytes:
+        data = bytearray(head)
+        for name, constant in tail:
+            push = pushes[name]
+            if len(push) > MAX_DIRECT_PUSH_SIZE:
+                raise ValueError(f'Cannot push {len(push)} bytes without OP_PUSHDATA1/2/4!')
+            data += PUSH_LENGTH_PREFIXES[len(push)]
+            data += push
+            data += constant
+
+        return bytes(data)
+
+    return encode
+
+
+class Script:
+    '''Script kept in its serialized form; the human readable form is only decoded when asked for.'''
+
+    __slots__ = ('data', '_script')
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self._script = None
+
+    @classmethod
+    def from_str(cls, script: str) -> Script:
+        # str() is always decoded from data, so equal scripts print the same whatever aliases or spacing script used
+        return cls(script_encode(script))
+
+    @classmethod
+    def from_hex(cls, data: str) -> Script:
+        return cls(bytes.fromhex(data))
+
+    def hex(self) -> str:
+        return self.data.hex()
+
+    def __str__(self):
+        if self._script is None:
+            self._script = script_decode(self.data)
+        return self._script
+
+    def __repr__(self):
+        return f'Script({str(self)!r})'
+
+    def __eq__(self, other):
+        if not isinstance(other, Script):
+            return NotImplemented
+        return self.data == other.data
+
+    def __hash__(self):
+        return hash(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def serialize(self) -> bytes:
+        return self.data
+
+
 class OpCodes(Enum):
     OP_0 = b'\x00'
     OP_FALSE = b'\x00'
@@ -120,7 +211,7 @@ class OpCodes(Enum):
     OP_DIV = b'\x96'
     OP_MOD = b'\x97'
     OP_LSHIFT = b'\x98'
-    OP_RSHIFT = b'\x99b'
+    OP_RSHIFT = b'\x99'
     OP_BOOLAND = b'\x9a'
     OP_BOOLOR = b'\x9b'
     OP_NUMEQUAL = b'\x9c'
@@ -158,3 +249,9 @@ class OpCodes(Enum):
     OP_NOP9 = b'\xb8'
     OP_NOP10 = b'\xb9'
     OP_INVALIDOPCODE = b'\xff'
+
+
+# Encoded opcodes by name, aliases (e.g. OP_FALSE) included, so encoding skips the Enum machinery
+OPCODE_BYTES = {name: opcode.value for name, opcode in OpCodes.__members__.items()}
+if any(len(opcode) != 1 for opcode in OPCODE_BYTES.values()):
+    raise ValueError('Every opcode has to be encoded as a single byte')
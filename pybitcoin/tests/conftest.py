@@ -0,0 +1,7 @@
+import os
+
+from hypothesis import settings
+
+# Examples doing full scalar multiplications can exceed Hypothesis' default deadline on slow or busy CI workers
+settings.register_profile('ci', deadline=None)
+settings.load_profile(os.getenv('HYPOTHESIS_PROFILE', 'default'))
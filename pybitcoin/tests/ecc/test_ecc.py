@@ -2,8 +2,21 @@ import pytest
 from hypothesis import assume, given, settings
 from hypothesis import strategies as st
 
-from pybitcoin.ecc import Parity, Point, secp256k1
-from pybitcoin.tests.ecc.fixtures import ADD_POINTS, MUL_POINTS, POINTS
+from pybitcoin.ecc import (
+    GLV_BETA,
+    GLV_LAMBDA,
+    WNAF_WIDTH,
+    Parity,
+    Point,
+    _glv_decompose,
+    _jac_to_affine,
+    _wnaf,
+    batch_inverse,
+    mpz,
+    secp256k1,
+)
+from pybitcoin.tests.ecc.fixtures import POINTS
+from pybitcoin.tests.strategies import add_points, mul_points, points
 
 
 @given(
@@ -83,28 +96,24 @@ def test_point_eq(coords_1, coords_2):
     assert Point(*coords_1) != Point(*coords_2)
 
 
-@given(coords=st.sampled_from(POINTS))
-def test_add_infinity(coords):
-    p = Point(*coords)
+@given(p=points)
+def test_add_infinity(p):
     inf = Point.inf()
 
     assert p + inf == inf + p == p
 
 
-@given(data=st.sampled_from(ADD_POINTS))
+@given(data=add_points)
 def test_add(data):
-    coords_1, coords_2, coords_res = data
-    p1 = Point(*coords_1)
-    p2 = Point(*coords_2)
+    p1, p2, res = data
 
-    assert p1 + p2 == Point(*coords_res)
+    assert p1 + p2 == res
 
 
-@given(coords=st.sampled_from(POINTS))
-def test_neg(coords):
-    assume(coords != (0, 0))
+@given(p=points)
+def test_neg(p):
+    assume((p.x, p.y) != (0, 0))
 
-    p = Point(*coords)
     p_ = -p
 
     assert p.x == p_.x and p.y + p_.y == secp256k1.p
@@ -117,10 +126,8 @@ def test_neg_infinity():
     assert p == p_
 
 
-@given(coords=st.sampled_from(POINTS))
-def test_mul_other_not_int(coords):
-    p = Point(*coords)
-
+@given(p=points)
+def test_mul_other_not_int(p):
     with pytest.raises(ValueError):
         p * p
 
@@ -129,10 +136,89 @@ def test_mul_other_not_int(coords):
 
 
 @settings(deadline=None)
-@given(data=st.sampled_from(MUL_POINTS))
+@given(data=mul_points)
 def test_mul(data):
-    coords_1, x, coords_2 = data
-    p1 = Point(*coords_1)
-    p2 = Point(*coords_2)
+    p1, x, p2 = data
 
     assert p1 * x == x * p1 == p2
+
+
+@given(p=points)
+def test_mul_zero(p):
+    assert p * 0 == 0 * p == Point.inf()
+    assert Point.inf() * 5 == Point.inf()
+
+
+@given(k=st.integers(min_value=0, max_value=secp256k1.n))
+def test_wnaf(k):
+    digits = _wnaf(k)
+
+    assert sum(d << i for i, d in enumerate(digits)) == k
+    assert all(d & 1 and abs(d) < 2 ** (WNAF_WIDTH - 1) for d in digits if d)
+    assert all(not any(digits[i + 1 : i + WNAF_WIDTH]) for i, d in enumerate(digits) if d)
+
+
+@given(k=st.integers(min_value=1, max_value=secp256k1.n - 1))
+def test_mul_gen(k):
+    '''Multiplying the generator through the precomputed table agrees with generic point arithmetic.'''
+    gen = Point.gen()
+    p = k * gen
+
+    assert p + gen == (k + 1) * gen
+    assert 2 * p == (2 * k) * gen
+
+
+@given(xs=st.lists(st.integers(min_value=1, max_value=secp256k1.p - 1)))
+def test_batch_inverse(xs):
+    assert batch_inverse(xs, secp256k1.p) == [pow(x, -1, secp256k1.p) for x in xs]
+
+
+@given(p=points, others=st.lists(points))
+def test_add_many(p, others):
+    others = others + [-p]
+
+    assert p.add_many(others) == [p + other for other in others]
+
+
+def test_point_from_x_not_on_curve():
+    # x^3 + 7 is not a quadratic residue for x = 5
+    with pytest.raises(ValueError):
+        Point.from_x(5, Parity.EVEN)
+
+
+@pytest.mark.parametrize('x', [-1, secp256k1.p, secp256k1.p + 1])
+def test_point_from_x_out_of_range(x):
+    with pytest.raises(ValueError):
+        Point.from_x(x, Parity.EVEN)
+
+
+@given(k=st.integers(min_value=0, max_value=secp256k1.n - 1))
+def test_glv_decompose(k):
+    k1, k2 = _glv_decompose(k, secp256k1.n)
+
+    assert (k1 + k2 * GLV_LAMBDA) % secp256k1.n == k
+    assert abs(k1).bit_length() <= 129 and abs(k2).bit_length() <= 129
+
+
+@given(p=points)
+def test_glv_endomorphism(p):
+    assume((p.x, p.y) != (0, 0))
+
+    assert GLV_LAMBDA * p == Point(GLV_BETA * p.x % secp256k1.p, p.y)
+
+
+def test_mpz_used_when_gmpy2_installed():
+    gmpy2 = pytest.importorskip('gmpy2')
+
+    assert mpz is gmpy2.mpz
+
+
+@given(p=points, k=st.integers(min_value=1, max_value=secp256k1.n - 1))
+def test_arithmetic_returns_plain_ints(p, k):
+    '''Arithmetic may run on gmpy2 integers internally, but the coordinates it returns are always Python ints.'''
+    g = Point.gen()
+    for q in (k * g, k * p, p + g, -p, *p.add_many([g])):
+        assert type(q.x) is int and type(q.y) is int
+
+    x, y = _jac_to_affine((mpz(g.x), mpz(g.y), mpz(1)), mpz(secp256k1.p))
+    assert type(x) is int and type(y) is int
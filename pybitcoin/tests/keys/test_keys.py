@@ -8,15 +8,20 @@ from pybitcoin.ecc import Point, secp256k1
 from pybitcoin.keys import (
     BASE58_ALPHABET,
     Base58DecodeError,
+    ExtendedPrivateKey,
+    ExtendedPublicKey,
     InvalidKeyError,
     PrivateKey,
     PublicKey,
+    _address_prefix_ranges,
     base58check_decode,
     base58check_encode,
+    hmac_sha512,
+    hmac_sha512_keyed,
     ripemd160,
     sha256,
 )
-from pybitcoin.tests.ecc.fixtures import POINTS
+from pybitcoin.tests.strategies import points
 
 
 @given(data=st.binary())
@@ -63,6 +68,12 @@ def test_base58check_decode_bad_alphabet(good_data, bad_data):
         base58check_decode(data)
 
 
+@given(good_data=st.text(alphabet=BASE58_ALPHABET), bad_char=st.characters(min_codepoint=128))
+def test_base58check_decode_non_ascii(good_data, bad_char):
+    with pytest.raises(Base58DecodeError):
+        base58check_decode(good_data + bad_char)
+
+
 @given(k=st.integers(min_value=1, max_value=secp256k1.p - 1))
 def test_private_key_k_ok(k):
     p = PrivateKey(k=k)
@@ -110,23 +121,23 @@ def test_private_key_wif_from_to(compressed, testnet):
     assert p == p_
 
 
-@given(coords=st.sampled_from(POINTS))
-def test_public_key_x_y_properties(coords):
-    pubk = PublicKey(point=Point(*coords))
+@given(point=points)
+def test_public_key_x_y_properties(point):
+    pubk = PublicKey(point=point)
 
-    assert (pubk.x, pubk.y) == coords
+    assert (pubk.x, pubk.y) == (point.x, point.y)
 
 
 @given(
-    coords=st.sampled_from(POINTS),
+    point=points,
     compressed=st.booleans(),
 )
-def test_public_key_encode(coords, compressed):
-    data = PublicKey(point=Point(*coords)).encode(compressed=compressed)
+def test_public_key_encode(point, compressed):
+    data = PublicKey(point=point).encode(compressed=compressed)
 
     if compressed:
         expected_length = 33
-        if coords[1] % 2 == 0:
+        if point.y % 2 == 0:
             expected_prefix = b"\x02"
         else:
             expected_prefix = b"\x03"
@@ -139,11 +150,11 @@ def test_public_key_encode(coords, compressed):
 
 
 @given(
-    coords=st.sampled_from(POINTS),
+    point=points,
     compressed=st.booleans(),
 )
-def test_public_key_get_identifier(coords, compressed):
-    pubk = PublicKey(point=Point(*coords))
+def test_public_key_get_identifier(point, compressed):
+    pubk = PublicKey(point=point)
 
     with patch("pybitcoin.keys.sha256") as mock_sha256, patch("pybitcoin.keys.ripemd160") as mock_ripemd160:
         pubk.get_identifier(compressed=compressed)
@@ -153,13 +164,108 @@ def test_public_key_get_identifier(coords, compressed):
 
 
 @given(
-    coords=st.sampled_from(POINTS),
+    point=points,
     compressed=st.booleans(),
     testnet=st.booleans(),
 )
-def test_public_key_to_address(coords, compressed, testnet):
-    address = PublicKey(Point(*coords), testnet=testnet).to_address(compressed=compressed)
+def test_public_key_to_address(point, compressed, testnet):
+    address = PublicKey(point, testnet=testnet).to_address(compressed=compressed)
 
     expected_prefixes = ['1'] if not testnet else ['m', 'n']
 
     assert address[0] in expected_prefixes
+
+
+@pytest.mark.parametrize('flag, expected', [(None, False), (0, False), (1, True), ('yes', True)])
+def test_key_flags_use_truthiness(flag, expected):
+    prv = PrivateKey(k=1, testnet=flag, compressed=flag)
+
+    assert prv.to_wif() == PrivateKey(k=1, testnet=expected, compressed=expected).to_wif()
+    assert PublicKey(Point.gen(), testnet=flag).to_address() == PublicKey(Point.gen(), testnet=expected).to_address()
+
+
+@given(
+    identifier=st.binary(min_size=20, max_size=20),
+    prefix_length=st.integers(min_value=1, max_value=34),
+)
+def test_address_prefix_ranges(identifier, prefix_length):
+    prefix = base58check_encode(b'\x00' + identifier)[:prefix_length]
+    value = int.from_bytes(identifier, byteorder='big')
+
+    assert any(lo <= value <= hi for lo, hi in _address_prefix_ranges(prefix))
+
+
+@pytest.mark.parametrize('prefix', ['1A', '1z', '11'])
+def test_vanity_address(prefix):
+    prv = PrivateKey.vanity_address(prefix, workers=1)
+
+    assert prv.generate_public_key().to_address(compressed=prv.compressed).startswith(prefix)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_vanity_address_workers(workers):
+    prv = PrivateKey.vanity_address('1B', workers=workers)
+
+    assert prv.generate_public_key().to_address(compressed=prv.compressed).startswith('1B')
+
+
+def test_vanity_address_impossible_prefix():
+    with pytest.raises(ValueError):
+        PrivateKey.vanity_address('1' * 23, workers=1)
+
+
+@pytest.mark.parametrize('prefix', ['1O', '10', '1Il'])
+def test_vanity_address_invalid_characters(prefix):
+    with pytest.raises(ValueError):
+        PrivateKey.vanity_address(prefix, workers=1)
+
+
+def test_private_key_from_wif_known_vector():
+    p = PrivateKey.from_wif('5HueCGU8rMjxEXxiPuD5BDku4MkFqeZyd4dZ1jvhTVqvbTLvyTJ')
+
+    assert p.k == 0x0C28FCA386C7A227600B2FE50B7CAE11EC86D3BF1FBE471BE89827E19D72AA1D
+    assert not p.compressed and not p.testnet
+
+
+def test_extended_private_key_reassigned_key():
+    extended = ExtendedPrivateKey(key=PrivateKey(k=1, compressed=True), chain_code=bytes(32))
+    extended.public_key
+    extended.key = PrivateKey(k=2, compressed=True)
+
+    assert extended.public_key.point == PrivateKey(k=2).generate_public_key().point
+    with pytest.raises(ValueError):
+        extended.key = extended.public_key
+
+
+@given(k=st.integers(min_value=1, max_value=secp256k1.n - 1))
+def test_generate_public_key_coincurve_matches_pure_python(k):
+    pytest.importorskip('coincurve')
+    prv = PrivateKey(k=k)
+
+    with patch('pybitcoin.keys.coincurve', None):
+        expected = prv.generate_public_key().point
+
+    assert prv.generate_public_key().point == expected
+
+
+@given(
+    k=st.integers(min_value=1, max_value=secp256k1.n - 1),
+    chain_code=st.binary(min_size=32, max_size=32),
+    index=st.integers(min_value=0, max_value=2 ** 31 - 1),
+)
+def test_derive_public_child_coincurve_matches_pure_python(k, chain_code, index):
+    pytest.importorskip('coincurve')
+    extended = ExtendedPublicKey(key=PrivateKey(k=k).generate_public_key(), chain_code=chain_code)
+
+    with patch('pybitcoin.keys.coincurve', None):
+        expected = extended.derive_public_child(index).key.point
+
+    assert extended.derive_public_child(index).key.point == expected
+
+
+@given(key=st.binary(), msg=st.binary())
+def test_hmac_sha512_keyed(key, msg):
+    h = hmac_sha512_keyed(key).copy()
+    h.update(msg)
+
+    assert h.digest() == hmac_sha512(key, msg)
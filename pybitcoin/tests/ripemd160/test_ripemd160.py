@@ -0,0 +1,26 @@
+import hashlib
+
+import pytest
+from hypothesis import given
+from hypothesis import strategies as st
+
+from pybitcoin.ripemd160 import ripemd160
+
+
+@pytest.mark.parametrize(
+    'data, digest',
+    [
+        (b'', '9c1185a5c5e9fc54612808977ee8f548b2258d31'),
+        (b'abc', '8eb208f7e05d987a9b044a8e98c6b087f15a0bfc'),
+        (b'message digest', '5d0689ef49d2fae572b881b123a85ffa21595f36'),
+        (b'1234567890' * 8, '9b752e45573d4b39f4dbd3323cab82bf63326bfb'),
+    ],
+)
+def test_ripemd160_known_vectors(data, digest):
+    assert ripemd160(data).hex() == digest
+
+
+@pytest.mark.skipif('ripemd160' not in hashlib.algorithms_available, reason='hashlib does not provide ripemd160')
+@given(st.binary(max_size=200))
+def test_ripemd160_matches_hashlib(data):
+    assert ripemd160(data) == hashlib.new('ripemd160', data).digest()
@@ -0,0 +1,76 @@
+import pytest
+from hypothesis import given
+from hypothesis import strategies as st
+
+from pybitcoin.script import (
+    MAX_DIRECT_PUSH_SIZE,
+    OpCodes,
+    Script,
+    compile_script_template,
+    script_decode,
+    script_encode,
+)
+
+
+def test_script_encode_p2pkh():
+    script = 'OP_DUP OP_HASH160 89abcdefabbaabbaabbaabbaabbaabbaabbaabba OP_EQUALVERIFY OP_CHECKSIG'
+
+    assert script_encode(script).hex() == '76a91489abcdefabbaabbaabbaabbaabbaabbaabbaabba88ac'
+
+
+@given(data=st.binary(min_size=1, max_size=MAX_DIRECT_PUSH_SIZE))
+def test_script_push_data_roundtrip(data):
+    script = f'OP_DUP {data.hex()} OP_DROP'
+
+    assert script_decode(script_encode(script)) == script
+
+
+def test_script_encode_push_too_long():
+    with pytest.raises(ValueError):
+        script_encode('ab' * (MAX_DIRECT_PUSH_SIZE + 1))
+
+
+@pytest.mark.parametrize('opcode', list(OpCodes.__members__))
+def test_script_opcode_roundtrip(opcode):
+    encoded = script_encode(opcode)
+
+    assert len(encoded) == 1
+    assert script_decode(encoded) == OpCodes(encoded).name
+
+
+@given(data=st.binary(min_size=1, max_size=MAX_DIRECT_PUSH_SIZE))
+def test_script_from_str_matches_serialized(data):
+    script = f'OP_DUP OP_HASH160 {data.hex()} OP_EQUALVERIFY OP_CHECKSIG'
+    parsed = Script.from_str(script)
+    deserialized = Script(parsed.serialize())
+
+    assert parsed == deserialized
+    assert str(deserialized) == script
+
+
+@given(pkh=st.binary(min_size=20, max_size=20), sig=st.binary(min_size=1, max_size=MAX_DIRECT_PUSH_SIZE))
+def test_compile_script_template(pkh, sig):
+    template = '{sig} OP_DUP OP_HASH160 {pkh} OP_EQUALVERIFY OP_CHECKSIG'
+    encode = compile_script_template(template)
+
+    assert encode(pkh=pkh, sig=sig) == script_encode(template.format(pkh=pkh.hex(), sig=sig.hex()))
+
+
+@given(data=st.binary(max_size=100))
+def test_script_from_hex(data):
+    script = Script.from_hex(data.hex())
+
+    assert script.serialize() == data
+    assert script.hex() == data.hex()
+
+
+def test_script_str_is_normalised():
+    script = Script.from_str('OP_FALSE  OP_TRUE')
+
+    assert script == Script(b'\x00\x51')
+    assert str(script) == str(Script(b'\x00\x51')) == 'OP_0 OP_1'
+
+
+def test_script_eq_other_type():
+    assert Script(b'\x51').__eq__(b'\x51') is NotImplemented
+    assert Script(b'\x51') != b'\x51'
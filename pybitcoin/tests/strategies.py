@@ -0,0 +1,12 @@
+'''Hypothesis strategies shared between test modules.
+
+Fixture points are validated once on import, not on every example.
+'''
+from hypothesis import strategies as st
+
+from pybitcoin.ecc import Point
+from pybitcoin.tests.ecc.fixtures import ADD_POINTS, MUL_POINTS, POINTS
+
+points = st.sampled_from([Point(*coords) for coords in POINTS])
+add_points = st.sampled_from([tuple(Point(*coords) for coords in data) for data in ADD_POINTS])
+mul_points = st.sampled_from([(Point(*coords_1), x, Point(*coords_2)) for coords_1, x, coords_2 in MUL_POINTS])
@@ -0,0 +1,116 @@
+import pytest
+from hypothesis import given
+from hypothesis import strategies as st
+
+from pybitcoin.script import Script
+from pybitcoin.transaction import Transaction, Vin, Vout, varint_decode, varint_encode, varint_encode_into
+
+
+@given(
+    x=st.integers(min_value=0, max_value=2 ** 64 - 1),
+    head=st.binary(max_size=10),
+    rest=st.binary(max_size=10),
+)
+def test_varint_roundtrip(x, head, rest):
+    encoded = varint_encode(x)
+
+    assert varint_decode(head + encoded + rest, len(head)) == (x, len(head) + len(encoded))
+
+
+@pytest.mark.parametrize(
+    'x, encoded',
+    [
+        (0, '00'),
+        (0xFC, 'fc'),
+        (0xFD, 'fdfd00'),
+        (0xFFFF, 'fdffff'),
+        (0x10000, 'fe00000100'),
+        (0x100000000, 'ff0000000001000000'),
+    ],
+)
+def test_varint_encode_compact_size(x, encoded):
+    assert varint_encode(x).hex() == encoded
+
+
+@given(value=st.integers(min_value=0, max_value=2 ** 64 - 1), script=st.binary(max_size=100))
+def test_vout_roundtrip(value, script):
+    data = Vout(value=value, script_pub_key=script).serialize()
+    vout, offset = Vout.deserialize(data)
+
+    assert (vout.value, vout.script_pub_key.serialize(), offset) == (value, script, len(data))
+
+
+@given(
+    txid=st.binary(min_size=32, max_size=32),
+    vout_index=st.integers(min_value=0, max_value=2 ** 32 - 1),
+    script=st.binary(max_size=100),
+    sequence=st.integers(min_value=0, max_value=2 ** 32 - 1),
+)
+def test_vin_roundtrip(txid, vout_index, script, sequence):
+    data = Vin(txid=txid.hex(), vout_index=vout_index, script_sig=script, sequence=sequence).serialize()
+    vin, offset = Vin.deserialize(data)
+
+    assert (vin.txid, vin.vout_index, vin.script_sig.serialize(), vin.sequence) == (
+        txid.hex(),
+        vout_index,
+        script,
+        sequence,
+    )
+    assert offset == len(data)
+
+
+@given(txid=st.binary(min_size=32, max_size=32))
+def test_vin_txid_setter(txid):
+    vin = Vin(txid=bytes(32), vout_index=0, script_sig=b'', sequence=0)
+    vin.txid = txid.hex()
+
+    assert vin.txid == txid.hex()
+    assert vin.serialize()[:32] == txid
+
+
+@pytest.mark.parametrize('txid', [b'', bytes(31), bytes(33), '00' * 31])
+def test_vin_txid_wrong_length(txid):
+    with pytest.raises(ValueError):
+        Vin(txid=txid, vout_index=0, script_sig=b'', sequence=0)
+
+    vin = Vin(txid=bytes(32), vout_index=0, script_sig=b'', sequence=0)
+    with pytest.raises(ValueError):
+        vin.txid = txid
+
+
+@given(
+    version=st.integers(min_value=0, max_value=2 ** 32 - 1),
+    locktime=st.integers(min_value=0, max_value=2 ** 32 - 1),
+    txids=st.lists(st.binary(min_size=32, max_size=32), max_size=5),
+    values=st.lists(st.integers(min_value=0, max_value=2 ** 64 - 1), max_size=5),
+)
+def test_transaction_roundtrip(version, locktime, txids, values):
+    vins = [Vin(txid=txid, vout_index=0, script_sig=b'\x00', sequence=0xFFFFFFFF) for txid in txids]
+    vouts = [Vout(value=value, script_pub_key=b'\x51') for value in values]
+    data = Transaction(version=version, locktime=locktime, vins=vins, vouts=vouts).serialize()
+    tx = Transaction.deserialize(data)
+
+    assert (tx.version, tx.locktime) == (version, locktime)
+    assert [vin.txid for vin in tx.vins] == [txid.hex() for txid in txids]
+    assert [vout.value for vout in tx.vouts] == values
+    assert tx.serialize() == data
+
+
+@given(x=st.integers(min_value=0, max_value=2 ** 64 - 1), head=st.binary(max_size=10))
+def test_varint_encode_into(x, head):
+    data = bytearray(head)
+    varint_encode_into(data, x)
+
+    assert data == head + varint_encode(x)
+
+
+def test_transaction_default_lists_not_shared():
+    tx = Transaction()
+    tx.vouts.append(Vout(value=1, script_pub_key=b'\x51'))
+
+    assert Transaction().vouts == []
+
+
+def test_str_script_is_tokens_not_hex():
+    assert Vout(value=0, script_pub_key='51').script_pub_key.serialize() == b'\x01\x51'
+    assert Vout(value=0, script_pub_key=Script.from_hex('51')).script_pub_key.serialize() == b'\x51'
@@ -6,7 +6,7 @@ from hypothesis import strategies as st
 
 from pybitcoin.mnemonic_code_words import MNEMONIC_CODE_WORDS
 from pybitcoin.tests.wallet.fixtures import BIP_32_TEST_VECTORS
-from pybitcoin.wallet import KeyStore, hmac_sha512, validate_mnemonic
+from pybitcoin.wallet import HDWallet, KeyStore, hmac_sha512, mnemonic_to_seed, validate_mnemonic
 
 
 @st.composite
@@ -89,3 +89,52 @@ def test_key_store_get_key(seed_hex, path, expected_pub, expected_priv):
 
     assert derived_key.to_wif() == expected_priv
     assert derived_public_key.to_wif() == expected_pub
+
+
+@pytest.mark.parametrize('seed_hex,path,expected_pub, expected_priv', BIP_32_TEST_VECTORS)
+def test_derive_public_child_matches_private_derivation(seed_hex, path, expected_pub, expected_priv):
+    key = KeyStore(root_seed=bytes.fromhex(seed_hex)).get_key(path)
+
+    for index in (0, 1, 2 ** 31 - 1):
+        expected = key.derive_private_child(index).generate_public_key()
+
+        assert key.generate_public_key().derive_public_child(index).to_wif() == expected.to_wif()
+
+
+@pytest.mark.parametrize('seed_hex,path,expected_pub, expected_priv', BIP_32_TEST_VECTORS)
+def test_key_store_derive_children(seed_hex, path, expected_pub, expected_priv):
+    seed = bytes.fromhex(seed_hex)
+    children = KeyStore(root_seed=seed).derive_children(path, 0, 3)
+
+    expected = [KeyStore(root_seed=seed).get_key(f'{path}/{index}') for index in range(3)]
+
+    assert [child.to_wif() for child in children] == [key.to_wif() for key in expected]
+
+
+def test_key_store_get_key_not_shared_between_callers():
+    key_store = KeyStore(root_seed=bytes(16))
+    expected = key_store.get_key('m/0/1').to_wif()
+
+    key_store.get_key('m/0').chain_code = bytes(32)
+
+    assert key_store.get_key('m/0/1').to_wif() == expected
+
+
+@pytest.mark.parametrize('path', ["m/4294967296'", "m/2147483648'", 'm/4294967296'])
+def test_key_store_get_key_index_out_of_range(path):
+    with pytest.raises(OverflowError):
+        KeyStore(root_seed=bytes(16)).get_key(path)
+
+
+def test_hd_wallet_from_mnemonic_batch():
+    mnemonics = [
+        'abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon abandon about',
+        'answer act aspect mansion report own orphan mixed leader gate siren there',
+    ]
+    wallets = HDWallet.from_mnemonic_batch(mnemonics, password='TREZOR', workers=2)
+
+    assert wallets[0]._seed.hex() == (
+        'c55257c360c07c72029aebc1b53c05ed0362ada38ead3e3e9efa3708e53495531f09a6987599d18264c1e1c92f2cf141630c7a3c4a'
+        'b7c81b2f001698e7463b04'
+    )
+    assert [wallet._seed for wallet in wallets] == [mnemonic_to_seed(m, password='TREZOR') for m in mnemonics]
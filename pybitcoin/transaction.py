@@ -1,72 +1,116 @@
 from __future__ import annotations
 
+from struct import Struct
 from typing import Tuple
 
-from pybitcoin.keys import BIG
-from pybitcoin.script import script_decode, script_encode
+from pybitcoin.script import Script
 
-LITTLE = 'little'
+# Fixed size little endian fields
+UINT16 = Struct('<H')
+UINT32 = Struct('<I')
+UINT64 = Struct('<Q')
 
-MSB = 2 ** 7
-VARINT_MASK = 2 ** 7 - 1
+# CompactSize: values below 0xFD are a single byte, larger ones a marker byte followed by a 2, 4 or 8 byte integer
+VARINT_SMALL = tuple(bytes((i,)) for i in range(0xFD))
+VARINT_STRUCTS = {0xFD: UINT16, 0xFE: UINT32, 0xFF: UINT64}
 
 
 def varint_encode(x: int) -> bytes:
-    data = b''
-    while x:
-        number = x & VARINT_MASK
-        x >>= 7
-        if x:
-            number |= MSB
-        data += number.to_bytes(1, byteorder=BIG)
-
-    return data
-
-
-def varint_decode(data: bytes) -> Tuple[int, bytes]:
-    '''Returns decoded varint and the remaining unconsumed data'''
-    x = 0
-    # TODO: is there an upper limit on how big the number can be?
-    for i, b in enumerate(data):
-        x += (b & VARINT_MASK) << 7 * i
-        if not b & MSB:
-            break
-
-    return x, data[i + 1 :]
+    if x < 0xFD:
+        return VARINT_SMALL[x]
+    if x <= 0xFFFF:
+        return b'\xfd' + UINT16.pack(x)
+    if x <= 0xFFFFFFFF:
+        return b'\xfe' + UINT32.pack(x)
+    return b'\xff' + UINT64.pack(x)
+
+
+def varint_encode_into(data: bytearray, x: int):
+    '''Appends the varint encoding of x to data, without creating an intermediate bytes object.'''
+    if x < 0xFD:
+        data.append(x)
+    elif x <= 0xFFFF:
+        data.append(0xFD)
+        data += UINT16.pack(x)
+    elif x <= 0xFFFFFFFF:
+        data.append(0xFE)
+        data += UINT32.pack(x)
+    else:
+        data.append(0xFF)
+        data += UINT64.pack(x)
+
+
+def varint_decode(data: bytes, offset: int = 0) -> Tuple[int, int]:
+    '''Returns the varint starting at offset and the offset right after it'''
+    prefix = data[offset]
+    if prefix < 0xFD:
+        return prefix, offset + 1
+
+    struct = VARINT_STRUCTS[prefix]
+    return struct.unpack_from(data, offset + 1)[0], offset + 1 + struct.size
+
+
+def _to_script(script: Script | bytes | str) -> Script:
+    '''Scripts can be given already serialized (as bytes) or as opcodes and hex pushes (as str).
+
+    A str is always read as script tokens, never as a serialized script in hex: a single hex push would be ambiguous.
+    Serialized hex scripts have to be passed as Script.from_hex(...) (or bytes.fromhex(...)).
+    '''
+    if isinstance(script, Script):
+        return script
+    if isinstance(script, (bytes, bytearray)):
+        return Script(bytes(script))
+    return Script.from_str(script)
 
 
 class Vin:
-    __slots__ = ['txid', 'vout_index', 'script_sig', 'sequence']
+    __slots__ = ['_txid', 'vout_index', 'script_sig', 'sequence']
 
-    def __init__(self, txid: str, vout_index: int, script_sig: str, sequence: int):
+    def __init__(self, txid: str | bytes, vout_index: int, script_sig: Script | bytes | str, sequence: int):
         self.txid = txid
         self.vout_index = vout_index
-        self.script_sig = script_sig
+        self.script_sig = _to_script(script_sig)
         self.sequence = sequence
 
+    @property
+    def txid(self) -> str:
+        return self._txid.hex()
+
+    @txid.setter
+    def txid(self, txid: str | bytes):
+        # Kept serialized, the hex form is only needed for display
+        txid = bytes.fromhex(txid) if isinstance(txid, str) else bytes(txid)
+        if len(txid) != 32:
+            raise ValueError(f'txid has to be 32 bytes long, got {len(txid)}')
+        self._txid = txid
+
     def serialize(self) -> bytes:
-        txid = bytes.from_hex(self.txid)
-        vout_index = self.vout_index.to_bytes(4, byteorder=LITTLE)
-        script_sig = script_encode(self.script_sig)
-        script_sig_len = varint_encode(len(script_sig))
-        sequence = self.sequence.to_bytes(4, byteorder=LITTLE)
+        data = bytearray()
+        self.serialize_into(data)
 
-        return txid + vout_index + script_sig_len + script_sig + sequence
+        return bytes(data)
+
+    def serialize_into(self, data: bytearray):
+        '''Appends the serialized vin to data.'''
+        script_sig = self.script_sig.serialize()
+
+        data += self._txid
+        data += UINT32.pack(self.vout_index)
+        varint_encode_into(data, len(script_sig))
+        data += script_sig
+        data += UINT32.pack(self.sequence)
 
     @classmethod
-    def deserialize(cls, data: bytes) -> Tuple[Vin, bytes]:
-        ''' Returns the deserialized vin and the remaining unconsumed data.'''
-        # TODO: txid should be str
-        txid = data[:32]
-        vout_index = int.from_bytes(data[32:36], byteorder=LITTLE)
-        script_sig_length, data = varint_decode(data[36:])
-        script_sig = script_decode(data[:script_sig_length])
-        sequence = int.from_bytes(data[script_sig_length : script_sig_length + 4], byteorder=LITTLE)
-
-        return (
-            cls(txid=txid, vout_index=vout_index, script_sig=script_sig, sequence=sequence),
-            data[script_sig_length + 4 :],
-        )
+    def deserialize(cls, data: bytes, offset: int = 0) -> Tuple[Vin, int]:
+        ''' Returns the vin deserialized from offset and the offset right after it.'''
+        txid = bytes(data[offset : offset + 32])
+        vout_index = UINT32.unpack_from(data, offset + 32)[0]
+        script_sig_length, offset = varint_decode(data, offset + 36)
+        end = offset + script_sig_length
+        script_sig = Script(bytes(data[offset:end]))
+        sequence = UINT32.unpack_from(data, end)[0]
+
+        return cls(txid=txid, vout_index=vout_index, script_sig=script_sig, sequence=sequence), end + 4
 
     def get_vout(self):
         '''Return the corresponding vout'''
@@ -76,64 +120,77 @@ class Vin:
 class Vout:
     __slots__ = ['value', 'script_pub_key']
 
-    def __init__(self, value: int, script_pub_key: str):
+    def __init__(self, value: int, script_pub_key: Script | bytes | str):
         self.value = value
-        self.script_pub_key = script_pub_key
+        self.script_pub_key = _to_script(script_pub_key)
 
     def serialize(self) -> bytes:
-        value = self.value.to_bytes(8, byteorder=LITTLE)
-        script = script_encode(self.script_pub_key)
-        script_length = varint_encode(len(script))
+        data = bytearray()
+        self.serialize_into(data)
+
+        return bytes(data)
 
-        return value + script_length + script
+    def serialize_into(self, data: bytearray):
+        '''Appends the serialized vout to data.'''
+        script = self.script_pub_key.serialize()
+
+        data += UINT64.pack(self.value)
+        varint_encode_into(data, len(script))
+        data += script
 
     @classmethod
-    def deserialize(cls, data: bytes) -> Tuple[Vout, bytes]:
-        ''' Returns the deserialized vout and the remaining unconsumed data.'''
-        value = int.from_bytes(data[:4], byteorder=LITTLE)
-        script_length, data = varint_decode(data[4:])
-        script = script_decode(data[:script_length])
+    def deserialize(cls, data: bytes, offset: int = 0) -> Tuple[Vout, int]:
+        ''' Returns the vout deserialized from offset and the offset right after it.'''
+        value = UINT64.unpack_from(data, offset)[0]
+        script_length, offset = varint_decode(data, offset + 8)
+        end = offset + script_length
+        script = Script(bytes(data[offset:end]))
 
-        return cls(value=value, script_pub_key=script), data[script_length:]
+        return cls(value=value, script_pub_key=script), end
 
 
 class Transaction:
-    def __init__(self, version=1, locktime=0, vins=[], vouts=[]):
+    __slots__ = ['version', 'locktime', 'vins', 'vouts']
+
+    def __init__(self, version=1, locktime=0, vins=None, vouts=None):
         self.version = version
         self.locktime = locktime
-        self.vins = vins
-        self.vouts = vouts
+        self.vins = [] if vins is None else vins
+        self.vouts = [] if vouts is None else vouts
 
     def serialize(self) -> bytes:
-        version = self.version.to_bytes(1, byteorder=LITTLE)
-        input_count = varint_encode(len(self.vins))
-        vins = b''.join(vin.serialize() for vin in self.vins)
-        output_count = varint_encode(len(self.vouts))
-        vouts = b''.join(vout.serialize() for vout in self.vouts)
-        locktime = self.locktime.to_bytes(4, byteorder=LITTLE)
-
-        return version + input_count + vins + output_count + vouts + locktime
+        # Everything is appended to one buffer instead of concatenating the serialized parts
+        data = bytearray(UINT32.pack(self.version))
+        varint_encode_into(data, len(self.vins))
+        for vin in self.vins:
+            vin.serialize_into(data)
+        varint_encode_into(data, len(self.vouts))
+        for vout in self.vouts:
+            vout.serialize_into(data)
+        data += UINT32.pack(self.locktime)
+
+        return bytes(data)
 
     @classmethod
     def deserialize(cls, data: bytes) -> Transaction:
         # TODO: Add data validation
-        version = int.from_bytes(data[:4], byteorder=LITTLE)
+        # Parsing advances an offset through a view of data, nothing but the scripts and txids gets copied
+        data = memoryview(data)
+        version = UINT32.unpack_from(data)[0]
 
         vins = []
-        input_count, data = varint_decode(data[4:])
-        while input_count > 0:
-            vin, data = Vin.deserialize(data)
+        input_count, offset = varint_decode(data, 4)
+        for _ in range(input_count):
+            vin, offset = Vin.deserialize(data, offset)
             vins.append(vin)
-            input_count -= 1
 
         vouts = []
-        output_count, data = varint_decode(data)
-        while output_count > 0:
-            vout, data = Vout.deserialize(data)
+        output_count, offset = varint_decode(data, offset)
+        for _ in range(output_count):
+            vout, offset = Vout.deserialize(data, offset)
             vouts.append(vout)
-            output_count -= 1
 
-        locktime = int.from_bytes(data, byteorder=LITTLE)
+        locktime = UINT32.unpack_from(data, offset)[0]
 
         return cls(version=version, locktime=locktime, vins=vins, vouts=vouts)
 
@@ -1,11 +1,15 @@
+from __future__ import annotations
+
 import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
 from secrets import randbits
+from typing import Iterable, List
 
 from pybitcoin.keys import BIG, HARDENED_CHILD_INDEX, ExtendedPrivateKey, PrivateKey, hmac_sha512, sha256
 from pybitcoin.mnemonic_code_words import MNEMONIC_CODE_WORDS, REVERSE_MNEMONIC_CODE_WORDS
 
-CHECKSUM_MASKS = {i: 2 ** i - 1 for i in range(4, 9)}
-
 WORD_MASK = 2 ** 11 - 1
 
 
@@ -28,14 +32,25 @@ def validate_mnemonic(mnemonic: str):
     checksum_length = num_words // 3
     sequence_num_bytes = num_words * 4 // 3
     sequence = (data >> checksum_length).to_bytes(sequence_num_bytes, BIG)
-    input_checksum = data & CHECKSUM_MASKS[checksum_length]
+    input_checksum = data & ((1 << checksum_length) - 1)
 
     sequence_checksum = sha256(sequence)
-    # Extract only first checksum_length BITS from first BYTE of checksum
-    if sequence_checksum[0] >> (8 - checksum_length) != input_checksum:
+    # Compare only the first checksum_length BITS of the first BYTE of checksum
+    shift = 8 - checksum_length
+    if sequence_checksum[0] & (0xFF << shift & 0xFF) != input_checksum << shift:
         raise ValueError('Invalid checksum of mnemonic sequence!')
 
 
+def mnemonic_to_seed(mnemonic: str, password='') -> bytes:
+    return hashlib.pbkdf2_hmac(
+        hash_name='sha512',
+        password=mnemonic.encode('utf-8'),
+        salt=b'mnemonic' + password.encode('utf-8'),
+        iterations=2048,
+        dklen=64,  # 512 bits
+    )
+
+
 class KeyStore:
     MASTER = 'm'
     RE_PATH = r"(\d+)'?"
@@ -59,6 +74,15 @@ class KeyStore:
 
         return key
 
+    def derive_children(self, path: str, start: int, stop: int) -> List[ExtendedPrivateKey]:
+        '''Derive the children of the key at path with indexes start, start + 1, ..., stop - 1.
+
+        The parent, and with it its public key, is derived only once for all of them.
+        '''
+        parent = self.get_key(path)
+
+        return [parent.derive_private_child(index=index) for index in range(start, stop)]
+
     def _get_indexes(self, levels):
         indexes = []
 
@@ -87,15 +111,24 @@ class HDWallet:
     def from_mnemonic(cls, mnemonic: str, password=''):
         validate_mnemonic(mnemonic)
 
-        seed = hashlib.pbkdf2_hmac(
-            hash_name='sha512',
-            password=mnemonic.encode('utf-8'),
-            salt=b'mnemonic' + password.encode('utf-8'),
-            iterations=2048,
-            dklen=64,  # 512 bits
-        )
+        return HDWallet(seed=mnemonic_to_seed(mnemonic, password), mnemonic=mnemonic)
+
+    @classmethod
+    def from_mnemonic_batch(cls, mnemonics: Iterable[str], password='', workers=None) -> List[HDWallet]:
+        '''Construct wallets for many mnemonics, e.g. when recovering a mnemonic with unknown words.
+
+        Only the PBKDF2 seed stretching runs in parallel, on a pool of worker threads (one per CPU by default), since
+        hashlib's pbkdf2_hmac releases the GIL while it runs. Validation and building the wallets and their key stores
+        happen on the calling thread.
+        '''
+        mnemonics = list(mnemonics)
+        for mnemonic in mnemonics:
+            validate_mnemonic(mnemonic)
+
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            seeds = list(executor.map(mnemonic_to_seed, mnemonics, repeat(password)))
 
-        return HDWallet(seed=seed, mnemonic=mnemonic)
+        return [HDWallet(seed=seed, mnemonic=mnemonic) for seed, mnemonic in zip(seeds, mnemonics)]
 
     @classmethod
     def new(cls, size_bits=256, password=''):
@@ -105,16 +138,18 @@ class HDWallet:
         entropy = randbits(size_bits)
         entropy_bytes = entropy.to_bytes(size_bits // 8, BIG)
         checksum = sha256(entropy_bytes)
-        checksum_length = size_bits // 32
-        checksum_part = checksum[0] >> (8 - checksum_length)
-        sequence = (entropy << checksum_length) + checksum_part
+
+        # The checksum bits (at most 8) follow the entropy directly; the zero padding keeps the 3 byte window below in
+        # bounds for the last word
+        data = entropy_bytes + bytes((checksum[0], 0, 0))
 
         mnemonic_words = []
-        for _ in range(size_bits * 3 // 32):
-            word_index = sequence & WORD_MASK
+        for bit_pos in range(0, size_bits * 3 // 32 * 11, 11):
+            i = bit_pos >> 3
+            window = data[i] << 16 | data[i + 1] << 8 | data[i + 2]
+            word_index = window >> (13 - (bit_pos & 7)) & WORD_MASK
             mnemonic_words.append(MNEMONIC_CODE_WORDS[word_index])
-            sequence >>= 11
 
-        mnemonic = ' '.join(reversed(mnemonic_words))
+        mnemonic = ' '.join(mnemonic_words)
 
         return HDWallet.from_mnemonic(mnemonic, password)